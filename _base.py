@@ -0,0 +1,49 @@
+"""
+LLM提供商的公共基类
+"""
+
+import time
+import random
+from typing import List, Dict, Iterator, Callable, TypeVar
+from abc import ABC, abstractmethod
+
+T = TypeVar("T")
+
+
+class LLMProvider(ABC):
+    """LLM提供商的抽象基类"""
+    
+    # 失败请求的重试次数，以及指数退避的初始/最大等待时间（秒）
+    max_retries = 3
+    retry_base_delay = 5.0
+    retry_max_delay = 60.0
+    
+    @abstractmethod
+    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """发送消息并获取回复"""
+        pass
+    
+    def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """流式发送消息，逐块返回回复内容（默认实现：一次性返回完整回复）"""
+        yield self.chat(messages, **kwargs)
+    
+    def _is_retryable(self, exc: Exception) -> bool:
+        """判断异常是否为可重试的临时错误（限流、网络、服务端错误）；子类按SDK的异常类型覆盖"""
+        return isinstance(exc, (ConnectionError, TimeoutError))
+    
+    def _with_retry(self, func: Callable[[], T]) -> T:
+        """
+        调用func，失败时按指数退避+随机抖动重试
+        
+        等待时间在[0, min(最大等待, 初始等待 * 2^重试次数)]内随机选取，
+        并发请求同时被限流时不会在同一时刻一起重试；不可重试的错误（如认证失败、请求无效）直接抛出
+        """
+        for attempt in range(self.max_retries):
+            try:
+                return func()
+            except Exception as e:
+                if attempt == self.max_retries - 1 or not self._is_retryable(e):
+                    raise  # 不可重试或最后一次重试失败则抛出异常
+                wait_time = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                print(f"      [重试] API调用失败，{wait_time:.1f}秒后重试... ({attempt + 1}/{self.max_retries})")
+                time.sleep(wait_time)
@@ -0,0 +1,47 @@
+"""
+环境变量快照 - 进程启动时读取一次，各模块共享
+"""
+
+import os
+
+# 会从环境变量/.env读取的配置项
+_ENV_KEYS = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "GEMINI_API_KEY", "MINERU_TOKEN")
+
+_DOTENV_LOADED = False
+
+OPENAI_API_KEY = None
+OPENAI_BASE_URL = None
+GEMINI_API_KEY = None
+MINERU_TOKEN = None
+
+
+def ensure_dotenv():
+    """加载.env文件，每个进程最多加载一次；所需变量都已在环境中时直接跳过"""
+    global _DOTENV_LOADED
+    if _DOTENV_LOADED:
+        return
+    _DOTENV_LOADED = True
+    
+    environ = os.environ
+    if all(environ.get(key) for key in _ENV_KEYS if key != "OPENAI_BASE_URL"):
+        return  # 密钥已全部由环境提供，无需查找和解析.env
+    
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(override=False)  # 自动加载.env文件，不覆盖已有的环境变量
+    except ImportError:
+        pass  # 如果没有安装python-dotenv，跳过
+
+
+def refresh_env_cache():
+    """重新读取环境变量（修改os.environ后调用，主要用于测试）"""
+    global OPENAI_API_KEY, OPENAI_BASE_URL, GEMINI_API_KEY, MINERU_TOKEN
+    ensure_dotenv()
+    environ = os.environ
+    OPENAI_API_KEY = environ.get("OPENAI_API_KEY")
+    OPENAI_BASE_URL = environ.get("OPENAI_BASE_URL")
+    GEMINI_API_KEY = environ.get("GEMINI_API_KEY")
+    MINERU_TOKEN = environ.get("MINERU_TOKEN")
+
+
+refresh_env_cache()
@@ -0,0 +1,146 @@
+"""
+Google Gemini 提供商
+"""
+
+import base64
+import hashlib
+import threading
+from datetime import timedelta
+from typing import Optional, List, Dict, Iterator
+
+import _env
+from _base import LLMProvider
+
+# 消息角色 -> Gemini纯文本提示中的前缀（未知角色的消息被忽略）
+_ROLE_PREFIX = {
+    "system": "System: ",
+    "user": "User: ",
+    "assistant": "Assistant: ",
+}
+
+# (api_key, model) -> GenerativeModel；多个提供商实例共用同一模型对象
+_MODELS = {}
+
+
+def _get_model(genai, api_key: str, model: str):
+    """获取（或创建）共享的GenerativeModel"""
+    key = (api_key, model)
+    client = _MODELS.get(key)
+    if client is None:
+        client = _MODELS.setdefault(key, genai.GenerativeModel(model))
+    return client
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini 提供商"""
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-pro",
+                 context_cache: bool = False, cache_ttl_minutes: int = 30):
+        """
+        Args:
+            api_key: Gemini API密钥（默认读取环境变量GEMINI_API_KEY）
+            model: 模型名称
+            context_cache: 是否为重复的消息前缀（系统提示+论文内容）创建显式上下文缓存，
+                需要模型支持且前缀足够长（否则自动回退为普通请求）
+            cache_ttl_minutes: 上下文缓存的有效期（分钟）
+        """
+        self.api_key = api_key or _env.GEMINI_API_KEY
+        self.model = model
+        self.context_cache = context_cache
+        self.cache_ttl_minutes = cache_ttl_minutes
+        if not self.api_key:
+            raise ValueError("需要提供Gemini API密钥")
+        
+        # 前缀哈希 -> 基于缓存内容创建的模型（None表示该前缀无法缓存）
+        self._cached_models = {}
+        self._cache_lock = threading.Lock()
+        
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self._genai = genai
+            self.client = _get_model(genai, self.api_key, self.model)
+        except ImportError:
+            raise ImportError("请安装google-generativeai库: pip install google-generativeai")
+    
+    def _is_retryable(self, exc: Exception) -> bool:
+        """限流、服务不可用、超时和服务端错误可重试"""
+        from google.api_core import exceptions
+        return isinstance(exc, (exceptions.ResourceExhausted, exceptions.ServiceUnavailable,
+                                exceptions.DeadlineExceeded, exceptions.InternalServerError))
+    
+    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """发送消息到Gemini并获取回复（带重试）"""
+        model, prompt = self._prepare(messages)
+        return self._with_retry(lambda: model.generate_content(prompt).text)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """流式发送消息到Gemini，逐块返回回复内容（建立连接失败时重试）"""
+        model, prompt = self._prepare(messages)
+        for chunk in self._with_retry(lambda: model.generate_content(prompt, stream=True)):
+            if chunk.text:
+                yield chunk.text
+    
+    def _prepare(self, messages: List[Dict[str, str]]):
+        """选择请求使用的模型和提示文本"""
+        # 只有最后一条消息随请求变化时，前面的消息可以走上下文缓存
+        if self.context_cache and len(messages) > 1:
+            cached_model = self._get_cached_model(messages[:-1])
+            if cached_model is not None:
+                return cached_model, self._to_contents(messages[-1:])
+        
+        return self.client, self._to_contents(messages)
+    
+    @staticmethod
+    def _to_prompt(messages: List[Dict]) -> str:
+        """将OpenAI格式的消息转换为Gemini的纯文本提示（多模态消息只取文本块）"""
+        texts = []
+        for msg in messages:
+            prefix = _ROLE_PREFIX.get(msg.get("role", "user"))
+            if prefix is None:
+                continue
+            content = msg.get("content", "")
+            if not isinstance(content, str):
+                content = "\n".join(block.get("text", "") for block in content if block.get("type") == "text")
+            texts.append(prefix + content)
+        return "\n\n".join(texts)
+    
+    @classmethod
+    def _to_contents(cls, messages: List[Dict]):
+        """将OpenAI格式的消息转换为Gemini请求内容：文本提示 + 以原始字节内联的图片"""
+        images = [
+            cls._decode_data_url(block["image_url"]["url"])
+            for msg in messages if not isinstance(msg.get("content", ""), str)
+            for block in msg["content"] if block.get("type") == "image_url"
+        ]
+        prompt = cls._to_prompt(messages)
+        return [prompt, *images] if images else prompt
+    
+    @staticmethod
+    def _decode_data_url(url: str) -> Dict:
+        """把 data:image/png;base64,... 形式的图片转换为Gemini的内联数据"""
+        header, _, data = url.partition(",")
+        mime_type = header[len("data:"):].split(";", 1)[0]
+        return {"mime_type": mime_type, "data": base64.b64decode(data)}
+    
+    def _get_cached_model(self, prefix: List[Dict[str, str]]):
+        """为消息前缀创建（或复用）显式上下文缓存，同一前缀只创建一次"""
+        prefix_text = self._to_prompt(prefix)
+        key = hashlib.sha256(prefix_text.encode('utf-8')).hexdigest()
+        
+        with self._cache_lock:
+            if key not in self._cached_models:
+                try:
+                    cache = self._genai.caching.CachedContent.create(
+                        model=self.model,
+                        contents=[prefix_text],
+                        ttl=timedelta(minutes=self.cache_ttl_minutes)
+                    )
+                    self._cached_models[key] = self._genai.GenerativeModel.from_cached_content(
+                        cached_content=cache
+                    )
+                except Exception as e:
+                    # 模型不支持或内容太短（低于最小缓存长度）时回退为普通请求
+                    print(f"      [提示] Gemini上下文缓存不可用，使用普通请求: {str(e)[:100]}")
+                    self._cached_models[key] = None
+            return self._cached_models[key]
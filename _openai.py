@@ -0,0 +1,139 @@
+"""
+OpenAI (ChatGPT) 提供商
+"""
+
+import json
+import time
+from typing import Optional, List, Dict, Iterator
+
+import _env
+from _base import LLMProvider
+
+# (api_key, base_url) -> OpenAI客户端；多个提供商实例共用同一客户端及其HTTP连接池
+_CLIENTS = {}
+
+
+def _get_client(api_key: str, base_url: Optional[str] = None):
+    """获取（或创建）共享的OpenAI客户端"""
+    key = (api_key, base_url)
+    client = _CLIENTS.get(key)
+    if client is None:
+        from openai import OpenAI
+        # 创建客户端，支持自定义base_url和超时设置
+        client_kwargs = {
+            "api_key": api_key,
+            "timeout": 120.0,  # 120秒超时
+            "max_retries": 0   # 重试由LLMProvider._with_retry统一处理，避免两层重试叠加
+        }
+        if base_url:
+            client_kwargs["base_url"] = base_url
+        client = _CLIENTS.setdefault(key, OpenAI(**client_kwargs))
+    return client
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI (ChatGPT) 提供商"""
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini", base_url: Optional[str] = None):
+        self.api_key = api_key or _env.OPENAI_API_KEY
+        self.base_url = base_url or _env.OPENAI_BASE_URL
+        self.model = model
+        
+        if not self.api_key:
+            raise ValueError("需要提供OpenAI API密钥")
+        
+        try:
+            self.client = _get_client(self.api_key, self.base_url)
+        except ImportError:
+            raise ImportError("请安装openai库: pip install openai")
+    
+    def _is_retryable(self, exc: Exception) -> bool:
+        """限流、连接失败/超时和服务端错误可重试"""
+        import openai
+        return isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError))
+    
+    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """发送消息到OpenAI并获取回复（带重试）"""
+        response = self._with_retry(lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **kwargs
+        ))
+        return response.choices[0].message.content
+    
+    def chat_stream(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        """流式发送消息到OpenAI，逐块返回回复内容（建立连接失败时重试）"""
+        stream = self._with_retry(lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **kwargs
+        ))
+        for chunk in stream:
+            if chunk.choices:
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
+    
+    def run_batch(self, messages_list: List[List[Dict]], poll_interval: float = 30.0,
+                  timeout: float = 24 * 3600, **kwargs) -> List[Optional[str]]:
+        """
+        通过Batch API提交一批互相独立的请求并等待完成（费用约为普通请求的一半）
+        
+        Args:
+            messages_list: 每个请求的消息列表
+            poll_interval: 查询批处理状态的间隔（秒）
+            timeout: 最长等待时间（秒），超时后取消批次并抛出异常；默认与24小时的完成窗口一致
+            **kwargs: 每个请求共用的额外参数（如response_format）
+            
+        Returns:
+            与messages_list一一对应的回复，失败的请求为None
+        """
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": self.model, "messages": messages, **kwargs}
+            }, ensure_ascii=False)
+            for i, messages in enumerate(messages_list)
+        ]
+        batch_file = self.client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode('utf-8')),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        print(f"      [Batch] 已提交 {len(lines)} 个请求，批次ID: {batch.id}")
+        
+        deadline = time.monotonic() + timeout
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.client.batches.cancel(batch.id)
+                raise Exception(f"Batch处理超时（{int(timeout)}秒），已取消批次: {batch.id}")
+            time.sleep(min(poll_interval, remaining))
+            batch = self.client.batches.retrieve(batch.id)
+            counts = batch.request_counts
+            done = f"{counts.completed + counts.failed}/{counts.total}" if counts else "?"
+            print(f"      [Batch] 状态: {batch.status}，已完成 {done} 个请求"
+                  f"（已等待{int(timeout - (deadline - time.monotonic()))}秒）")
+        
+        if batch.status != "completed" and not batch.output_file_id:
+            raise Exception(f"Batch处理失败: {batch.status}")
+        
+        # 输出文件的行顺序不保证与输入一致，按custom_id分回原位置
+        replies = [None] * len(messages_list)
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    replies[int(item["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+        return replies
@@ -0,0 +1,250 @@
+"""
+PDF转Markdown转换器
+"""
+
+import io
+import time
+import functools
+import uuid
+import zipfile
+from typing import Optional
+from pathlib import Path
+from concurrent.futures import Executor
+
+import _env
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pymupdf():
+    """首次使用pymupdf4llm转换时才导入（导入较慢，MinerU模式用不到），未安装时返回None"""
+    try:
+        import pymupdf4llm
+    except ImportError:
+        return None
+    return pymupdf4llm
+
+
+class PDFConverter:
+    """将PDF转换为Markdown的转换器"""
+    
+    def __init__(self, use_mineru: bool = False, mineru_token: Optional[str] = None,
+                 process_pool: Optional[Executor] = None):
+        """
+        初始化PDF转换器
+        
+        Args:
+            use_mineru: 是否使用MinerU API（更好地支持图片和公式）
+            mineru_token: MinerU API token（可从环境变量MINERU_TOKEN读取）
+            process_pool: 可选的进程池；pymupdf4llm转换是受GIL限制的CPU密集任务，
+                多线程并发转换时交给子进程才能真正并行
+        """
+        self.use_mineru = use_mineru
+        self.mineru_token = mineru_token or _env.MINERU_TOKEN
+        self.process_pool = process_pool
+        self._session = None  # MinerU请求共用的requests.Session（首次使用MinerU时创建）
+        
+        if use_mineru and not self.mineru_token:
+            print("警告: 未提供MinerU token，将回退到pymupdf4llm")
+            self.use_mineru = False
+    
+    @staticmethod
+    def markdown_path_for(pdf_path: str, output_dir: Optional[str] = None) -> Path:
+        """
+        计算PDF对应的markdown输出路径
+        
+        Args:
+            pdf_path: PDF文件路径
+            output_dir: 输出目录，如果不指定则使用PDF同目录
+            
+        Returns:
+            markdown文件路径（图片保存在其同级的images文件夹）
+        """
+        pdf_path = Path(pdf_path)
+        if output_dir:
+            output_path = Path(output_dir) / f"{pdf_path.stem}.md"
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            output_path = pdf_path.with_suffix('.md')
+        return output_path
+    
+    def to_text(self, pdf_path: str, output_dir: Optional[str] = None) -> str:
+        """
+        将PDF转换为Markdown文本，直接返回字符串而不写入markdown文件
+        
+        Args:
+            pdf_path: PDF文件路径
+            output_dir: 输出目录（MinerU提取的图片保存在其中的images文件夹）
+            
+        Returns:
+            markdown文本
+        """
+        # 不预先检查文件是否存在：打开文件时会自然抛出FileNotFoundError，由调用方处理
+        pdf_path = Path(pdf_path)
+        output_path = self.markdown_path_for(pdf_path, output_dir)
+        
+        # 尝试使用MinerU API（更好的图片和公式支持）
+        if self.use_mineru:
+            print(f"📡 使用MinerU API转换PDF（支持图片和公式）...")
+            try:
+                return self._convert_with_mineru(pdf_path, output_path)
+            except FileNotFoundError:
+                raise  # 文件不存在时回退到pymupdf4llm也没有意义
+            except Exception as e:
+                print(f"❌ MinerU转换失败，回退到pymupdf4llm: {e}")
+        else:
+            print(f"⚡ 使用pymupdf4llm快速转换...")
+        
+        # 使用pymupdf4llm作为备选
+        return self._convert_with_pymupdf(pdf_path)
+    
+    def convert_to_markdown(self, pdf_path: str, output_dir: Optional[str] = None, save: bool = True) -> str:
+        """
+        将PDF转换为Markdown（支持图片和公式提取），已有转换结果时直接读取
+        
+        Args:
+            pdf_path: PDF文件路径
+            output_dir: 输出目录，如果不指定则使用PDF同目录
+            save: 是否把转换结果写入markdown文件
+            
+        Returns:
+            markdown文本
+        """
+        output_path = self.markdown_path_for(pdf_path, output_dir)
+        
+        # 如果已存在转换结果（且不早于PDF），跳过转换；同名PDF被替换后重新转换
+        if output_path.exists() and output_path.stat().st_mtime >= Path(pdf_path).stat().st_mtime:
+            print(f"⚠️  已存在Markdown文件，跳过转换: {output_path}")
+            print(f"提示：如需重新转换，请删除output文件夹或该文件")
+            return output_path.read_text(encoding='utf-8')
+        
+        md_text = self.to_text(pdf_path, output_dir)
+        
+        # 保存markdown文件
+        if save:
+            output_path.write_text(md_text, encoding='utf-8')
+            print(f"PDF已转换为Markdown: {output_path}")
+        return md_text
+    
+    def _get_session(self):
+        """获取MinerU请求共用的Session：保持HTTP长连接，轮询时不必每次重新握手TLS"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            session = requests.Session()
+            # 网关错误和限流时自动重试（默认只重试GET/PUT等幂等请求）
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504])
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+    
+    def _convert_with_mineru(self, pdf_path: Path, output_path: Path) -> str:
+        """使用MinerU API转换（支持图片和公式），返回markdown文本，图片解压到output_path同级目录"""
+        session = self._get_session()
+        header = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.mineru_token}"
+        }
+        
+        # 先打开PDF：文件不存在时直接抛出FileNotFoundError，不会白白申请上传URL
+        with open(pdf_path, 'rb') as f:
+            # 1. 申请上传URL
+            url = "https://mineru.net/api/v4/file-urls/batch"
+            data = {
+                "enable_formula": True,  # 启用公式识别
+                "enable_table": True,
+                "model_version": "vlm",
+                "files": [{"name": pdf_path.name, "data_id": str(uuid.uuid4())}]
+            }
+            
+            response = session.post(url, headers=header, json=data)
+            response.raise_for_status()
+            result = response.json()
+            
+            if result.get("code") != 0:
+                raise Exception(f"申请上传失败: {result}")
+            
+            batch_id = result["data"]["batch_id"]
+            upload_url = result["data"]["file_urls"][0]
+            
+            # 2. 上传PDF
+            print(f"📤 正在上传PDF文件...")
+            upload_response = session.put(upload_url, data=f)
+            upload_response.raise_for_status()
+        
+        print(f"✅ 上传成功！批次ID: {batch_id}")
+        print(f"⏳ 等待MinerU处理（可能需要1-3分钟）...")
+        
+        # 3. 轮询结果（MinerU处理需要数分钟，间隔从5秒起按1.5倍增长，最长30秒）
+        retrieve_url = f"https://mineru.net/api/v4/extract-results/batch/{batch_id}"
+        timeout = 600
+        deadline = time.monotonic() + timeout
+        interval = 5.0
+        polls = 0
+        
+        while time.monotonic() < deadline:
+            # 不睡过截止时间：最后一次轮询正好在截止时刻进行
+            time.sleep(max(0.0, min(interval, deadline - time.monotonic())))
+            res = session.get(retrieve_url, headers=header)
+            res.raise_for_status()
+            payload = res.json()
+            results = payload.get("data", {}).get("extract_result", [])
+            
+            if results and results[0].get("state") == "done":
+                zip_url = results[0].get("full_zip_url")
+                if not zip_url:
+                    raise Exception("未获取到下载链接")
+                
+                print(f"✅ MinerU处理完成，正在下载结果...")
+                
+                # 4. 下载结果到内存（不落盘中间的.zip文件）
+                response = session.get(zip_url, stream=True)
+                response.raise_for_status()
+                
+                buffer = io.BytesIO()
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    buffer.write(chunk)
+                buffer.seek(0)
+                
+                # 5. 解压并提取markdown
+                with zipfile.ZipFile(buffer, 'r') as zf:
+                    # 读取full.md（保留在内存中，由调用方决定是否写盘）
+                    if 'full.md' not in zf.namelist():
+                        raise Exception("转换结果中缺少full.md")
+                    md_text = zf.read('full.md').decode('utf-8')
+                    
+                    # 提取images文件夹
+                    images_dir = output_path.parent / "images"
+                    images_dir.mkdir(exist_ok=True)
+                    for member in zf.namelist():
+                        if member.startswith('images/'):
+                            zf.extract(member, output_path.parent)
+                
+                print(f"✅ MinerU转换完成（含图片和公式）")
+                return md_text
+            
+            polls += 1
+            if polls % 5 == 0:
+                print(f"等待转换完成... (已等待{int(timeout - (deadline - time.monotonic()))}秒)")
+            
+            # 服务端给出Retry-After时按其建议的间隔等待（限制在5~30秒内）
+            retry_after = res.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                interval = min(max(float(retry_after), 5.0), 30.0)
+            else:
+                interval = min(interval * 1.5, 30.0)
+        
+        raise Exception("转换超时")
+    
+    def _convert_with_pymupdf(self, pdf_path: Path) -> str:
+        """使用pymupdf4llm转换（备选方案），返回markdown文本"""
+        pymupdf4llm = _get_pymupdf()
+        if pymupdf4llm is None:
+            raise ImportError("请安装pymupdf4llm库: pip install pymupdf4llm")
+        
+        # 转换PDF到markdown
+        if self.process_pool is not None:
+            return self.process_pool.submit(pymupdf4llm.to_markdown, str(pdf_path)).result()
+        return pymupdf4llm.to_markdown(str(pdf_path))
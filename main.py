@@ -3,280 +3,139 @@
 支持多种LLM提供商（OpenAI、Gemini等）
 """
 
+import io
 import os
-from typing import Optional, List, Dict
-from abc import ABC, abstractmethod
+import re
+import sys
+import logging
+import importlib
+import multiprocessing
+import functools
+import threading
+import time
+from typing import Optional, List, Dict, NamedTuple, Tuple
 import json
+import base64
+import shutil
+import hashlib
+from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
-# 加载环境变量
-try:
-    from dotenv import load_dotenv
-    load_dotenv()  # 自动加载.env文件
-except ImportError:
-    pass  # 如果没有安装python-dotenv，跳过
+from _base import LLMProvider
+from _env import refresh_env_cache  # 导入时加载.env并缓存API密钥
 
+# 分析进度日志；批量处理时可将级别调为WARNING以关闭进度输出
+logger = logging.getLogger(__name__)
 
-class LLMProvider(ABC):
-    """LLM提供商的抽象基类"""
-    
-    @abstractmethod
-    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        """发送消息并获取回复"""
-        pass
 
+# 按需加载的组件：属性名 -> 私有子模块
+# OpenAI/Gemini SDK 和 PDF转换依赖较重，只在首次访问时才导入
+_LAZY_ATTRS = {
+    "OpenAIProvider": "_openai",
+    "GeminiProvider": "_gemini",
+    "PDFConverter": "_pdf",
+}
 
-class OpenAIProvider(LLMProvider):
-    """OpenAI (ChatGPT) 提供商"""
-    
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini", base_url: Optional[str] = None):
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
-        self.model = model
-        
-        if not self.api_key:
-            raise ValueError("需要提供OpenAI API密钥")
-        
-        try:
-            from openai import OpenAI
-            # 创建客户端，支持自定义base_url和超时设置
-            client_kwargs = {
-                "api_key": self.api_key,
-                "timeout": 120.0,  # 120秒超时
-                "max_retries": 3   # 最多重试3次
-            }
-            if self.base_url:
-                client_kwargs["base_url"] = self.base_url
-            self.client = OpenAI(**client_kwargs)
-        except ImportError:
-            raise ImportError("请安装openai库: pip install openai")
-    
-    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        """发送消息到OpenAI并获取回复（带重试）"""
-        import time
-        max_retries = 3
-        
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    **kwargs
-                )
-                return response.choices[0].message.content
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 5  # 5秒、10秒、15秒
-                    print(f"      [重试] API调用失败，{wait_time}秒后重试... ({attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                else:
-                    raise  # 最后一次重试失败则抛出异常
+# LLM提供商名称 -> 提供商类名
+_PROVIDERS = {
+    "openai": "OpenAIProvider",
+    "gemini": "GeminiProvider",
+}
 
 
-class GeminiProvider(LLMProvider):
-    """Google Gemini 提供商"""
-    
-    def __init__(self, api_key: Optional[str] = None, model: str = "gemini-pro"):
-        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        self.model = model
-        if not self.api_key:
-            raise ValueError("需要提供Gemini API密钥")
-        
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=self.api_key)
-            self.client = genai.GenerativeModel(self.model)
-        except ImportError:
-            raise ImportError("请安装google-generativeai库: pip install google-generativeai")
-    
-    def chat(self, messages: List[Dict[str, str]], **kwargs) -> str:
-        """发送消息到Gemini并获取回复"""
-        # 将OpenAI格式的消息转换为Gemini格式
-        prompt_parts = []
-        for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            if role == "system":
-                prompt_parts.append(f"System: {content}")
-            elif role == "user":
-                prompt_parts.append(f"User: {content}")
-            elif role == "assistant":
-                prompt_parts.append(f"Assistant: {content}")
-        
-        prompt = "\n\n".join(prompt_parts)
-        response = self.client.generate_content(prompt)
-        return response.text
-
-
-class PDFConverter:
-    """将PDF转换为Markdown的转换器"""
-    
-    def __init__(self, use_mineru: bool = False, mineru_token: Optional[str] = None):
-        """
-        初始化PDF转换器
-        
-        Args:
-            use_mineru: 是否使用MinerU API（更好地支持图片和公式）
-            mineru_token: MinerU API token（可从环境变量MINERU_TOKEN读取）
-        """
-        self.use_mineru = use_mineru
-        self.mineru_token = mineru_token or os.getenv('MINERU_TOKEN')
-        
-        if use_mineru and not self.mineru_token:
-            print("警告: 未提供MinerU token，将回退到pymupdf4llm")
-            self.use_mineru = False
-    
-    def convert_to_markdown(self, pdf_path: str, output_dir: Optional[str] = None) -> str:
-        """
-        将PDF转换为Markdown（支持图片和公式提取）
-        
-        Args:
-            pdf_path: PDF文件路径
-            output_dir: 输出目录，如果不指定则使用PDF同目录
-            
-        Returns:
-            转换后的markdown文件路径
-        """
-        pdf_path = Path(pdf_path)
-        if not pdf_path.exists():
-            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
-        
-        # 确定输出路径
-        if output_dir:
-            output_path = Path(output_dir) / f"{pdf_path.stem}.md"
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-        else:
-            output_path = pdf_path.with_suffix('.md')
-        
-        # 如果已存在转换结果，跳过转换
-        if output_path.exists():
-            print(f"⚠️  已存在Markdown文件，跳过转换: {output_path}")
-            print(f"提示：如需重新转换，请删除output文件夹或该文件")
-            return str(output_path)
-        
-        # 尝试使用MinerU API（更好的图片和公式支持）
-        if self.use_mineru:
-            print(f"📡 使用MinerU API转换PDF（支持图片和公式）...")
-            try:
-                return self._convert_with_mineru(pdf_path, output_path)
-            except Exception as e:
-                print(f"❌ MinerU转换失败，回退到pymupdf4llm: {e}")
-        else:
-            print(f"⚡ 使用pymupdf4llm快速转换...")
-        
-        # 使用pymupdf4llm作为备选
-        return self._convert_with_pymupdf(pdf_path, output_path)
-    
-    def _convert_with_mineru(self, pdf_path: Path, output_path: Path) -> str:
-        """使用MinerU API转换（支持图片和公式）"""
-        import requests
-        import uuid
-        import time
-        import zipfile
-        import shutil
-        
-        header = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.mineru_token}"
-        }
-        
-        # 1. 申请上传URL
-        url = "https://mineru.net/api/v4/file-urls/batch"
-        data = {
-            "enable_formula": True,  # 启用公式识别
-            "enable_table": True,
-            "model_version": "vlm",
-            "files": [{"name": pdf_path.name, "data_id": str(uuid.uuid4())}]
-        }
-        
-        response = requests.post(url, headers=header, json=data)
-        response.raise_for_status()
-        result = response.json()
-        
-        if result.get("code") != 0:
-            raise Exception(f"申请上传失败: {result}")
-        
-        batch_id = result["data"]["batch_id"]
-        upload_url = result["data"]["file_urls"][0]
-        
-        # 2. 上传PDF
-        print(f"📤 正在上传PDF文件...")
-        with open(pdf_path, 'rb') as f:
-            upload_response = requests.put(upload_url, data=f)
-            upload_response.raise_for_status()
-        
-        print(f"✅ 上传成功！批次ID: {batch_id}")
-        print(f"⏳ 等待MinerU处理（可能需要1-3分钟）...")
-        
-        # 3. 轮询结果
-        retrieve_url = f"https://mineru.net/api/v4/extract-results/batch/{batch_id}"
-        max_retry = 180
-        retry = 0
-        
-        while retry < max_retry:
-            time.sleep(3)
-            res = requests.get(retrieve_url, headers=header)
-            res.raise_for_status()
-            payload = res.json()
-            results = payload.get("data", {}).get("extract_result", [])
-            
-            if results and results[0].get("state") == "done":
-                zip_url = results[0].get("full_zip_url")
-                if not zip_url:
-                    raise Exception("未获取到下载链接")
-                
-                print(f"✅ MinerU处理完成，正在下载结果...")
-                
-                # 4. 下载并解压结果
-                zip_path = output_path.with_suffix('.zip')
-                response = requests.get(zip_url, stream=True)
-                response.raise_for_status()
-                
-                with open(zip_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                # 5. 解压并提取markdown
-                with zipfile.ZipFile(zip_path, 'r') as zf:
-                    # 提取full.md
-                    if 'full.md' in zf.namelist():
-                        with zf.open('full.md') as src:
-                            with open(output_path, 'wb') as dst:
-                                shutil.copyfileobj(src, dst)
-                    
-                    # 提取images文件夹
-                    images_dir = output_path.parent / "images"
-                    images_dir.mkdir(exist_ok=True)
-                    for member in zf.namelist():
-                        if member.startswith('images/'):
-                            zf.extract(member, output_path.parent)
-                
-                print(f"PDF已转换为Markdown（含图片和公式）: {output_path}")
-                return str(output_path)
-            
-            retry += 1
-            if retry % 10 == 0:
-                print(f"等待转换完成... ({retry}/{max_retry})")
-        
-        raise Exception("转换超时")
+def __getattr__(name):
+    """模块级延迟导入（PEP 562），如 `from main import OpenAIProvider`"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # 缓存到模块命名空间，之后不再经过__getattr__
+    return value
+
+
+def _resolve(name):
+    """在模块内部取延迟组件（模块内的名字查找不会触发__getattr__）"""
+    try:
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_pil():
+    """首次需要缩小图片时才导入Pillow（可选依赖），未安装时返回None"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+class QuestionCategory(NamedTuple):
+    """一个类别的分析问题（不可变，可在并发请求间直接共享）"""
+    category: str
+    questions: Tuple[str, ...]
+
+
+# 回答规则：基本信息类严格精简，其他类别宽松限制但要求简洁
+_BRIEF_RULES = """回答必须极简：
+
+严格要求：
+1. 只用要点列表，不用段落
+2. 2-3个要点，每个不超过20字
+3. 直接给结论，不要解释过程
+4. 用数据/名词而非描述
+5. 总字数<60字
+6. 如果看到图片，优先分析图片内容
+7. 用简体中文回答"""
+_BRIEF_REQUIREMENT = "要求：每个问题2-3个要点，每点不超过20字，每个问题总共<60字。"
+
+_DEFAULT_RULES = """回答要简洁明了：
+
+要求：
+1. 列出所有必要的关键要点（数量由内容复杂度决定，不要为了凑数）
+2. 每个要点控制在50字以内，言简意赅
+3. 直接说重点，避免铺垫和冗余
+4. 结合论文的具体内容（方法名、章节、图表、数据）
+5. 使用要点列表形式，逻辑清晰
+6. 用具体的数据、方法名、章节名等实质性信息
+7. 如果看到图片，优先分析图片传达的核心信息
+8. 用简体中文回答"""
+_DEFAULT_REQUIREMENT = "要求：每个问题列出所有关键要点，每个要点简洁明了（50字以内）。根据内容复杂度决定要点数量，既不遗漏重点也不冗余凑数。"
+
+# markdown中的图片引用，匹配 ![...](images/xxx.png) 格式
+_IMAGE_REF = re.compile(r'!\[.*?\]\((images/[^)]+)\)')
+
+# LLM回复外层可能包裹的 ```json 代码块
+_JSON_FENCE = re.compile(r'^```(?:json)?\s*(.*?)\s*```$', re.S)
+
+# 回复无法按JSON解析时，按行首编号（如 "1." "2、" "### 3."）拆分
+_NUMBERED_SECTION = re.compile(r'^\s*(?:#+\s*)?(?:问题\s*)?\d+\s*[.、:：)]\s*', re.M)
+
+# 参考文献章节的标题行（如 "## References"、"# 7 参考文献"），超出字数上限时从这里截掉
+_REFERENCES_HEADING = re.compile(
+    r'^#{1,6}\s*(?:[\dIVX]+\.?\s*)?(?:references|bibliography|参考文献)\s*$',
+    re.I | re.M
+)
+
+
+def _build_question_prompt(category: str, questions: List[str]) -> str:
+    """生成某个类别的提问文本（回答规则 + 问题列表 + 输出格式），不含论文内容"""
+    if category == "基本信息":
+        rules, requirement = _BRIEF_RULES, _BRIEF_REQUIREMENT
+    else:
+        rules, requirement = _DEFAULT_RULES, _DEFAULT_REQUIREMENT
     
-    def _convert_with_pymupdf(self, pdf_path: Path, output_path: Path) -> str:
-        """使用pymupdf4llm转换（备选方案）"""
-        try:
-            import pymupdf4llm
-        except ImportError:
-            raise ImportError("请安装pymupdf4llm库: pip install pymupdf4llm")
-        
-        # 转换PDF到markdown
-        md_text = pymupdf4llm.to_markdown(str(pdf_path))
-        
-        # 保存markdown文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(md_text)
-        
-        print(f"PDF已转换为Markdown: {output_path}")
-        return str(output_path)
+    question_list = "\n".join(f"{i}. {q}" for i, q in enumerate(questions, 1))
+    return f"""{rules}
+
+请依次回答以下{len(questions)}个问题：
+{question_list}
+
+{requirement}
+
+以JSON格式返回：{{"answers": ["问题1的回答", "问题2的回答", ...]}}，answers按问题顺序排列，共{len(questions)}项，每项是该问题的完整回答（可包含Markdown要点列表）。"""
 
 
 class PaperAnalyzer:
@@ -285,80 +144,141 @@ class PaperAnalyzer:
     @staticmethod
     def extract_images_from_markdown(markdown_path: Path) -> List[Path]:
         """从markdown文件中提取图片路径"""
-        import re
-        
-        with open(markdown_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = markdown_path.read_text(encoding='utf-8')
+        return PaperAnalyzer.extract_images_from_text(content, markdown_path.parent)
+    
+    @staticmethod
+    def extract_images_from_text(content: str, base_dir: Path) -> List[Path]:
+        """从markdown文本中提取图片路径（图片路径相对于base_dir）"""
+        # 同一张图片可能被引用多次，按首次出现的顺序去重
+        image_refs = dict.fromkeys(match.group(1) for match in _IMAGE_REF.finditer(content))
+        if not image_refs:
+            return []
         
-        # 匹配 ![...](images/xxx.png) 格式
-        image_pattern = r'!\[.*?\]\((images/[^)]+)\)'
-        image_refs = re.findall(image_pattern, content)
+        # 读取一次images目录得到已有文件名，代替逐个引用调用exists()
+        try:
+            with os.scandir(base_dir / "images") as entries:
+                existing = {entry.name for entry in entries if entry.is_file()}
+        except (FileNotFoundError, NotADirectoryError):
+            existing = set()
         
-        # 转换为绝对路径
-        base_dir = markdown_path.parent
+        # 转换为绝对路径（images下更深层的引用仍逐个检查）
         image_paths = []
         for ref in image_refs:
             img_path = base_dir / ref
-            if img_path.exists():
+            name = ref[len("images/"):]
+            found = img_path.exists() if "/" in name else name in existing
+            if found:
                 image_paths.append(img_path)
         
         return image_paths
     
-    @staticmethod
-    def image_to_base64(image_path: Path) -> str:
-        """将图片转换为base64编码"""
-        import base64
-        
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
+    # 发送给LLM的图片最长边（像素），超过时缩小并重新编码为JPEG（需要Pillow）
+    MAX_IMAGE_SIDE = 1024
+    
+    @classmethod
+    def image_to_base64(cls, image_path: Path) -> str:
+        """将图片转换为base64编码（过大的图片先缩小）"""
+        image_data = image_path.read_bytes()
         
         # 获取图片格式
         ext = image_path.suffix.lower().lstrip('.')
         if ext == 'jpg':
             ext = 'jpeg'
         
+        shrunk = cls._shrink_image(image_data, cls.MAX_IMAGE_SIDE)
+        if shrunk is not None:
+            image_data, ext = shrunk, 'jpeg'
+        
         base64_str = base64.b64encode(image_data).decode('utf-8')
         return f"data:image/{ext};base64,{base64_str}"
     
+    @staticmethod
+    def _shrink_image(image_data: bytes, max_side: int) -> Optional[bytes]:
+        """把最长边超过max_side的图片缩小并编码为JPEG；未安装Pillow、无需缩小或编码后反而更大时返回None"""
+        pil = _load_pil()
+        if pil is None:
+            return None
+        
+        with pil.open(io.BytesIO(image_data)) as img:
+            if max(img.size) <= max_side:
+                return None
+            img.thumbnail((max_side, max_side), pil.LANCZOS)
+            # JPEG不支持透明通道，透明部分铺白底（论文图表的背景通常是白色）
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = pil.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+            buffer = io.BytesIO()
+            img.save(buffer, "JPEG", quality=85, optimize=True)
+        
+        shrunk = buffer.getvalue()
+        return shrunk if len(shrunk) < len(image_data) else None
+    
     # 论文分析问题模板
-    ANALYSIS_QUESTIONS = [
-        {
-            "category": "基本信息",
-            "questions": [
-                "这篇论文发表在什么平台（期刊或会议）？该平台在该领域的权威性如何？",
-                "这篇论文的主要创新点是什么？与现有工作相比有哪些突破？",
-            ]
-        },
-        {
-            "category": "论文结构与写作",
-            "questions": [
-                "这篇论文展现了研究工作的哪些方面（如问题定义、方法设计、实验验证、结果分析等）？",
-                "作者是如何安排这些方面的先后顺序的？它们之间的逻辑关联是如何排布的？",
-                "论文每个章节的主要内容是什么？章节之间如何过渡和衔接？",
-                "论文的摘要和结论分别强调了哪些内容？它们如何呼应？",
-            ]
-        },
-        {
-            "category": "图表分析",
-            "questions": [
-                "论文包含哪些图片和表格？每个图表分别介绍了论文工作的哪些方面？",
-                "这些图表在论文中的位置如何安排？它们如何与文字内容相关联？",
-                "哪些图表最能体现论文的核心贡献和创新点？",
-                "图表的设计（如配色、布局、标注）有什么特点？它们如何帮助读者理解内容？",
-            ]
-        },
-        {
-            "category": "写作建议",
-            "questions": [
-                "如果我要发表类似的工作，应该如何组织论文结构？",
-                "我应该在论文中重点呈现哪些工作内容？哪些内容需要详细描述，哪些可以简略？",
-                "我应该把哪些工作通过图片或表格呈现出来？如何设计这些图表？",
-            ]
-        }
-    ]
+    ANALYSIS_QUESTIONS = (
+        QuestionCategory("基本信息", (
+            "这篇论文发表在什么平台（期刊或会议）？该平台在该领域的权威性如何？",
+            "这篇论文的主要创新点是什么？与现有工作相比有哪些突破？",
+        )),
+        QuestionCategory("论文结构与写作", (
+            "这篇论文展现了研究工作的哪些方面（如问题定义、方法设计、实验验证、结果分析等）？",
+            "作者是如何安排这些方面的先后顺序的？它们之间的逻辑关联是如何排布的？",
+            "论文每个章节的主要内容是什么？章节之间如何过渡和衔接？",
+            "论文的摘要和结论分别强调了哪些内容？它们如何呼应？",
+        )),
+        QuestionCategory("图表分析", (
+            "论文包含哪些图片和表格？每个图表分别介绍了论文工作的哪些方面？",
+            "这些图表在论文中的位置如何安排？它们如何与文字内容相关联？",
+            "哪些图表最能体现论文的核心贡献和创新点？",
+            "图表的设计（如配色、布局、标注）有什么特点？它们如何帮助读者理解内容？",
+        )),
+        QuestionCategory("写作建议", (
+            "如果我要发表类似的工作，应该如何组织论文结构？",
+            "我应该在论文中重点呈现哪些工作内容？哪些内容需要详细描述，哪些可以简略？",
+            "我应该把哪些工作通过图片或表格呈现出来？如何设计这些图表？",
+        )),
+    )
+    
+    # 所有请求共用的系统提示（各类别的具体要求放在提问消息中，保持请求前缀一致）
+    SYSTEM_PROMPT = """你是论文分析专家。用户会先提供论文全文，随后就论文提出问题。
+请严格按照每次提问给出的要求和输出格式作答，用简体中文回答。"""
+    
+    # 以下在类定义时构建一次，每次分析直接复用
+    _SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+    _PAPER_PREFIX = "论文内容：\n\n"
+    
+    # 各类别的提问文本：QuestionCategory -> 提问文本
+    _QUESTION_PROMPTS = {
+        info: _build_question_prompt(info.category, info.questions)
+        for info in ANALYSIS_QUESTIONS
+    }
     
-    def __init__(self, llm_provider: LLMProvider):
+    # 各类别发送的图片数量上限（图表分析类需要看更多图片，基本信息类不需要），其余类别为3
+    _MAX_IMAGES = {"图表分析": 10, "基本信息": 0}
+    
+    def __init__(self, llm_provider: LLMProvider, max_concurrency: int = 4,
+                 cache_dir: Optional[Path] = Path(".paper_cache"), stream: bool = False,
+                 max_paper_chars: Optional[int] = 200_000, cache_ttl_days: Optional[float] = 7):
+        """
+        Args:
+            llm_provider: LLM提供商
+            max_concurrency: 同时进行的LLM请求数上限（受限于API速率限制时可调小）
+            cache_dir: LLM回答的磁盘缓存目录，按(模型, 系统提示, 提问, 论文内容, 图片)的哈希命中；None表示不缓存
+            cache_ttl_days: 磁盘缓存的有效期（天），过期的回答重新请求；None表示永不过期
+            stream: 是否以流式方式接收LLM回复（长回答不会因整体超时而失败）
+            max_paper_chars: 发送给LLM的论文字数上限，超出时先去掉参考文献再截断；None表示总是发送全文
+        """
         self.llm = llm_provider
+        self.max_concurrency = max(1, max_concurrency)
+        self.stream = stream
+        self.max_paper_chars = max_paper_chars
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.cache_ttl = cache_ttl_days * 86400 if cache_ttl_days is not None else None
+        self._memory_cache = {}  # 同一进程内的缓存：哈希 -> 回复
         self.analysis_results = {}
     
     def analyze_paper(self, markdown_path: str) -> Dict[str, any]:
@@ -372,136 +292,366 @@ class PaperAnalyzer:
             分析结果字典
         """
         # 读取论文内容
-        md_path = Path(markdown_path)
-        with open(md_path, 'r', encoding='utf-8') as f:
-            paper_content = f.read()
-        
-        # 提取图片
-        image_paths = self.extract_images_from_markdown(md_path)
-        print(f"开始分析论文...")
-        print(f"论文字数: {len(paper_content)}")
-        print(f"论文图片数: {len(image_paths)}")
+        paper_content = Path(markdown_path).read_text(encoding='utf-8')
+        return self.analyze_text(paper_content, markdown_path)
+    
+    def analyze_text(self, paper_content: str, source_path: str,
+                     report_path: Optional[str] = None) -> Dict[str, any]:
+        """
+        分析已在内存中的论文markdown文本并回答所有问题
         
+        Args:
+            paper_content: 论文markdown文本
+            source_path: 论文markdown路径（图片相对其所在目录解析，并记录在报告中）
+            report_path: 如果指定，边分析边写入Markdown报告（每完成一个类别写入一节；
+                分析过程中写入同目录的.partial文件，全部类别成功后才替换为report_path；
+                有类别请求失败时保留.partial文件，report_path不会出现，下次运行会重新分析）
+            
+        Returns:
+            分析结果字典（failed_categories列出请求失败、回答为错误信息的类别）
+        """
         results = {
-            "paper_path": markdown_path,
-            "categories": []
+            "paper_path": source_path,
+            "categories": [],
+            "failed_categories": []
         }
+        jobs = self._build_jobs(paper_content, source_path)
+        
+        # 边分析边写报告：先写报告头，之后每完成一个类别追加一节
+        # 中途出错时report_path不会出现半份报告（已完成类别的回答在缓存中，重跑时直接命中）
+        report_file = None
+        if report_path:
+            report_path = Path(report_path)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            partial_path = report_path.with_name(report_path.name + ".partial")
+            report_file = partial_path.open('w', encoding='utf-8')
+            report_file.write(self._render_header(source_path))
+            report_file.flush()
+        
+        # 各类别的请求互相独立，并发发送；按原顺序收集结果
+        logger.info(f"\n正在请求LLM（{len(jobs)}个请求，最多{self.max_concurrency}个并发）...")
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(jobs))) as executor:
+                futures = [
+                    executor.submit(self._ask_category, category, messages, len(questions), cache_key)
+                    for category, questions, messages, cache_key in jobs
+                ]
+                for (category, questions, _, _), future in zip(jobs, futures):
+                    answers, ok = future.result()
+                    if not ok:
+                        results["failed_categories"].append(category)
+                    category_result = self._category_result(category, questions, answers)
+                    results["categories"].append(category_result)
+                    if report_file is not None:
+                        report_file.write(self._render_category(category_result))
+                        report_file.flush()
+        finally:
+            if report_file is not None:
+                report_file.close()
+        
+        if report_file is not None:
+            if results["failed_categories"]:
+                logger.warning(f"⚠️  {len(results['failed_categories'])}个类别分析失败，"
+                               f"报告未完成，保留为: {partial_path}")
+            else:
+                os.replace(partial_path, report_path)
         
-        # 对每个类别的问题进行分析
-        for category_info in self.ANALYSIS_QUESTIONS:
-            category = category_info["category"]
-            questions = category_info["questions"]
+        self.analysis_results = results
+        return results
+    
+    def analyze_papers_batched(self, markdown_paths: List[str], poll_interval: float = 30.0,
+                               timeout: float = 24 * 3600) -> List[Dict[str, any]]:
+        """
+        通过提供商的Batch API一次性分析多篇论文（费用约为普通请求的一半，但需等待批处理完成，
+        适合不着急拿结果的离线批量分析）
+        
+        Args:
+            markdown_paths: 论文markdown文件路径列表
+            poll_interval: 查询批处理状态的间隔（秒）
+            timeout: 等待批处理完成的最长时间（秒），超时后取消批次并抛出异常
             
-            print(f"\n分析类别: {category}")
-            category_result = {
-                "category": category,
-                "qa_pairs": []
+        Returns:
+            与markdown_paths一一对应的分析结果字典列表
+        """
+        if not hasattr(self.llm, "run_batch"):
+            raise ValueError(f"该LLM提供商不支持Batch API: {type(self.llm).__name__}")
+        
+        # 收集所有论文的所有类别请求，缓存命中的不再提交
+        papers = []
+        pending = []
+        for markdown_path in markdown_paths:
+            paper_content = Path(markdown_path).read_text(encoding='utf-8')
+            jobs = self._build_jobs(paper_content, markdown_path)
+            replies = [self._cached_reply(cache_key) for _, _, _, cache_key in jobs]
+            pending.extend(
+                (len(papers), j) for j, reply in enumerate(replies) if reply is None
+            )
+            papers.append((markdown_path, jobs, replies))
+        
+        if pending:
+            logger.info(f"\n提交Batch API请求（{len(pending)}个请求，{len(papers)}篇论文）...")
+            batch_replies = self.llm.run_batch(
+                [papers[p][1][j][2] for p, j in pending],
+                poll_interval=poll_interval,
+                timeout=timeout,
+                response_format={"type": "json_object"}
+            )
+            # 按提交顺序把回复分回各论文的各类别
+            for (p, j), reply in zip(pending, batch_replies):
+                _, jobs, replies = papers[p]
+                if reply is not None:
+                    self._store_reply(jobs[j][3], reply)
+                    replies[j] = reply
+        
+        all_results = []
+        for markdown_path, jobs, replies in papers:
+            categories = []
+            failed_categories = []
+            for (category, questions, _, _), reply in zip(jobs, replies):
+                if reply is None:
+                    # 批处理中失败的请求：与普通请求一样返回错误信息作为回答
+                    logger.error(f"    [错误] {category}: Batch请求未返回结果")
+                    answers = ["[API错误: Batch请求未返回结果]"] * len(questions)
+                    failed_categories.append(category)
+                else:
+                    answers = self._parse_answers(reply, len(questions))
+                categories.append(self._category_result(category, questions, answers))
+            all_results.append({"paper_path": markdown_path, "categories": categories,
+                                "failed_categories": failed_categories})
+        
+        if all_results:
+            self.analysis_results = all_results[-1]
+        return all_results
+    
+    def _build_jobs(self, paper_content: str, source_path: str) -> List[Tuple[str, Tuple[str, ...], List[Dict], str]]:
+        """为每个类别构建请求：[(类别, 问题列表, 消息, 缓存键)]"""
+        # 过长的论文只发送预算内的部分（所有类别共用同一份文本，保持前缀一致）
+        paper_content = self._fit_to_budget(paper_content)
+        
+        # 只从实际发送的文本中提取图片：被截掉部分引用的图片LLM看不到上下文，不再附带
+        image_paths = self.extract_images_from_text(paper_content, Path(source_path).parent)
+        logger.info(f"开始分析论文...\n论文字数: {len(paper_content)}\n论文图片数: {len(image_paths)}")
+        
+        # 论文内容的哈希只计算一次，作为各类别缓存键的一部分
+        paper_digest = hashlib.sha256(paper_content.encode('utf-8')).hexdigest()
+        
+        # 所有请求共享的前缀：系统提示 + 论文全文。
+        # 前缀逐字节一致（不含时间戳等可变内容），便于服务端的提示缓存命中
+        # （OpenAI对≥1024 tokens的重复前缀自动缓存，Gemini可用显式上下文缓存）
+        shared_prefix = [
+            self._SYSTEM_MESSAGE,
+            {
+                "role": "user",
+                "content": self._PAPER_PREFIX + paper_content
             }
+        ]
+        
+        # 同一张图片会发给多个类别，每篇论文只读取和编码一次：图片路径 -> (base64, 其哈希)
+        encoded_images = {}
+        
+        # 为每个类别构建请求（同一类别的问题合并为一次请求）
+        jobs = []
+        for category_info in self.ANALYSIS_QUESTIONS:
+            category = category_info.category
+            questions = category_info.questions
             
-            for i, question in enumerate(questions, 1):
-                print(f"  问题 {i}/{len(questions)}: {question[:50]}...")
-                
-                # 根据类别选择不同的提示词策略
-                if category == "基本信息":
-                    # 基本信息类：严格精简
-                    requirement = "要求：2-3个要点，每点不超过20字，总共<60字。"
-                    system_prompt = """你是论文分析专家。回答必须极简：
-
-严格要求：
-1. 只用要点列表，不用段落
-2. 2-3个要点，每个不超过20字
-3. 直接给结论，不要解释过程
-4. 用数据/名词而非描述
-5. 总字数<60字
-6. 如果看到图片，优先分析图片内容
-7. 用简体中文回答"""
-                else:
-                    # 其他类别：宽松限制，但要求简洁
-                    requirement = "要求：列出所有关键要点，每个要点简洁明了（50字以内）。根据内容复杂度决定要点数量，既不遗漏重点也不冗余凑数。"
-                    system_prompt = """你是论文分析专家。回答要简洁明了：
-
-要求：
-1. 列出所有必要的关键要点（数量由内容复杂度决定，不要为了凑数）
-2. 每个要点控制在50字以内，言简意赅
-3. 直接说重点，避免铺垫和冗余
-4. 结合论文的具体内容（方法名、章节、图表、数据）
-5. 使用要点列表形式，逻辑清晰
-6. 用具体的数据、方法名、章节名等实质性信息
-7. 如果看到图片，优先分析图片传达的核心信息
-8. 用简体中文回答"""
-                
-                # 根据类别决定发送的图片数量（减少数量避免连接超时）
-                if category == "图表分析":
-                    # 图表分析类需要看更多图片
-                    max_images = min(len(image_paths), 10)
-                elif category == "基本信息":
-                    # 基本信息类只需少量图片
-                    max_images = min(len(image_paths), 0)
-                else:
-                    # 其他类别中等数量
-                    max_images = min(len(image_paths), 3)
-                
-                # 构建用户消息内容（支持多模态）
-                user_content = [
-                    {
-                        "type": "text",
-                        "text": f"""{paper_content}
-
-问题：{question}
-
-{requirement}"""
-                    }
-                ]
-                
-                # 添加图片到消息中（转换为base64）
-                sent_images = []
-                for img_path in image_paths[:max_images]:
-                    try:
-                        base64_image = self.image_to_base64(img_path)
-                        user_content.append({
-                            "type": "image_url",
-                            "image_url": {"url": base64_image}
-                        })
-                        sent_images.append(img_path.name)
-                    except Exception as e:
-                        print(f"    警告: 无法加载图片 {img_path.name}: {e}")
-                
-                # 显示发送的图片信息
-                if sent_images:
-                    print(f"    📎 已发送 {len(sent_images)} 张图片: {', '.join(sent_images[:3])}{'...' if len(sent_images) > 3 else ''}")
-                
-                # 构建消息
-                messages = [
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_content
-                    }
-                ]
-                
-                # 获取LLM回答（带错误处理）
+            # 同一类别的进度信息合并为一条日志输出
+            progress = [f"\n分析类别: {category}（{len(questions)}个问题合并为一次请求）"]
+            progress.extend(
+                f"  问题 {i}/{len(questions)}: {question[:50]}..."
+                for i, question in enumerate(questions, 1)
+            )
+            logger.info("\n".join(progress))
+            
+            # 提问文本在类定义时已生成；问题列表被修改过时才现场生成
+            question_prompt = self._QUESTION_PROMPTS.get(QuestionCategory(category, tuple(questions)))
+            if question_prompt is None:
+                question_prompt = _build_question_prompt(category, questions)
+            
+            # 根据类别决定发送的图片数量（减少数量避免连接超时）
+            max_images = min(len(image_paths), self._MAX_IMAGES.get(category, 3))
+            
+            # 构建本类别的提问消息（支持多模态），放在共享前缀之后
+            user_content = [
+                {
+                    "type": "text",
+                    "text": question_prompt
+                }
+            ]
+            
+            # 添加图片到消息中（转换为base64）
+            sent_images = []
+            image_digests = []
+            for img_path in image_paths[:max_images]:
                 try:
-                    answer = self.llm.chat(messages)
-                    category_result["qa_pairs"].append({
-                        "question": question,
-                        "answer": answer
+                    encoded = encoded_images.get(img_path)
+                    if encoded is None:
+                        base64_image = self.image_to_base64(img_path)
+                        digest = hashlib.sha256(base64_image.encode('ascii')).hexdigest()
+                        encoded = encoded_images[img_path] = (base64_image, digest)
+                    user_content.append({
+                        "type": "image_url",
+                        "image_url": {"url": encoded[0]}
                     })
+                    sent_images.append(img_path.name)
+                    image_digests.append(encoded[1])
                 except Exception as e:
-                    error_msg = f"[API错误: {str(e)[:100]}]"
-                    print(f"    [错误] {error_msg}")
-                    category_result["qa_pairs"].append({
-                        "question": question,
-                        "answer": error_msg
-                    })
-                    # 继续处理下一个问题，而不是完全失败
+                    logger.warning(f"    警告: 无法加载图片 {img_path.name}: {e}")
+            
+            # 显示发送的图片信息
+            if sent_images:
+                logger.info(f"    📎 已发送 {len(sent_images)} 张图片: {', '.join(sent_images[:3])}{'...' if len(sent_images) > 3 else ''}")
             
-            results["categories"].append(category_result)
+            # 构建消息
+            messages = shared_prefix + [
+                {
+                    "role": "user",
+                    "content": user_content
+                }
+            ]
+            
+            cache_key = self._cache_key(question_prompt, paper_digest, image_digests)
+            jobs.append((category, questions, messages, cache_key))
         
-        self.analysis_results = results
-        return results
+        return jobs
+    
+    @staticmethod
+    def _category_result(category: str, questions, answers: List[str]) -> Dict:
+        """把一个类别的问题和回答组装为结果字典"""
+        return {
+            "category": category,
+            "qa_pairs": [
+                {"question": question, "answer": answer}
+                for question, answer in zip(questions, answers)
+            ]
+        }
+    
+    def _fit_to_budget(self, paper_content: str) -> str:
+        """
+        论文超过字数上限时先去掉参考文献及之后的内容，仍超出则截断到上限
+        
+        从第一个参考文献标题处截断，其后的附录也一并去掉
+        """
+        limit = self.max_paper_chars
+        if limit is None or len(paper_content) <= limit:
+            return paper_content
+        
+        original_length = len(paper_content)
+        match = _REFERENCES_HEADING.search(paper_content)
+        if match:
+            paper_content = paper_content[:match.start()].rstrip()
+        if len(paper_content) > limit:
+            paper_content = paper_content[:limit]
+        logger.info(f"论文超过{limit}字，发送前{len(paper_content)}字（原文{original_length}字）")
+        return paper_content
+    
+    def _cache_key(self, question_prompt: str, paper_digest: str, image_digests: List[str] = ()) -> str:
+        """LLM回答的缓存键：sha256(模型 | 系统提示 | 提问 | 论文内容哈希 | 所发送图片的哈希)"""
+        model = getattr(self.llm, "model", type(self.llm).__name__)
+        key = f"{model}|{self.SYSTEM_PROMPT}|{question_prompt}|{paper_digest}|{','.join(image_digests)}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def _ask_category(self, category: str, messages: List[Dict], count: int,
+                      cache_key: Optional[str] = None) -> Tuple[List[str], bool]:
+        """发送一个类别的合并请求，返回(该类别所有问题的回答, 请求是否成功)（带缓存和错误处理）"""
+        reply = self._cached_reply(cache_key)
+        if reply is not None:
+            logger.info(f"    💾 {category}: 使用缓存的回答")
+            return self._parse_answers(reply, count), True
+        
+        try:
+            if self.stream:
+                reply = "".join(self.llm.chat_stream(messages, response_format={"type": "json_object"}))
+            else:
+                reply = self.llm.chat(messages, response_format={"type": "json_object"})
+        except Exception as e:
+            error_msg = f"[API错误: {str(e)[:100]}]"
+            logger.error(f"    [错误] {category}: {error_msg}")
+            # 返回错误信息作为回答，其他类别照常处理，而不是完全失败
+            return [error_msg] * count, False
+        
+        # 只缓存成功的回答（写缓存失败不影响已拿到的回答）
+        self._store_reply(cache_key, reply)
+        return self._parse_answers(reply, count), True
+    
+    def _cached_reply(self, cache_key: Optional[str]) -> Optional[str]:
+        """查找缓存的回复：先查内存缓存，再查磁盘缓存；未命中返回None"""
+        if not cache_key:
+            return None
+        reply = self._memory_cache.get(cache_key)
+        if reply is None and self.cache_dir is not None:
+            cache_file = self.cache_dir / f"{cache_key}.txt"
+            try:
+                expired = (self.cache_ttl is not None
+                           and time.time() - cache_file.stat().st_mtime > self.cache_ttl)
+                if not expired:
+                    reply = cache_file.read_text(encoding='utf-8')
+                    self._memory_cache[cache_key] = reply
+            except FileNotFoundError:
+                pass
+            except (OSError, UnicodeDecodeError) as e:
+                # 缓存文件不可读或已损坏时按未命中处理，重新请求
+                logger.warning(f"    ⚠️  读取缓存失败，重新请求: {e}")
+        return reply
+    
+    def _store_reply(self, cache_key: Optional[str], reply: str):
+        """把回复写入内存缓存和磁盘缓存"""
+        if not cache_key:
+            return
+        self._memory_cache[cache_key] = reply
+        if self.cache_dir is not None:
+            # 先写临时文件再原子替换，进程中途退出时不会留下被截断的缓存
+            cache_file = self.cache_dir / f"{cache_key}.txt"
+            tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_file.write_text(reply, encoding='utf-8')
+                os.replace(tmp_file, cache_file)
+            except OSError as e:
+                # 缓存只是加速手段：写盘失败（无权限、磁盘已满）时只保留内存缓存，不丢弃已付费的回复
+                logger.warning(f"    ⚠️  写入缓存失败，本次回答只保存在内存中: {e}")
+                try:
+                    tmp_file.unlink()
+                except OSError:
+                    pass
+    
+    @staticmethod
+    def _parse_answers(reply: str, count: int) -> List[str]:
+        """
+        解析合并请求的回复
+        
+        Args:
+            reply: LLM回复（期望为 {"answers": [...]} 格式的JSON）
+            count: 问题数量
+            
+        Returns:
+            与问题一一对应的回答列表
+        """
+        # 去掉可能包裹在外面的 ```json 代码块
+        text = reply.strip()
+        fence = _JSON_FENCE.match(text)
+        if fence:
+            text = fence.group(1)
+        
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            data = data.get("answers")
+        if isinstance(data, list) and len(data) == count:
+            return [
+                answer if isinstance(answer, str) else json.dumps(answer, ensure_ascii=False)
+                for answer in data
+            ]
+        
+        # 回退：按行首编号拆分
+        sections = _NUMBERED_SECTION.split(text)
+        if len(sections) - 1 == count:
+            return [section.strip() for section in sections[1:]]
+        
+        # 无法拆分时，完整回复放在第一个问题下，避免丢失内容
+        return [reply] + ["（见本类别第一个问题的合并回答）"] * (count - 1)
     
     def save_analysis_report(self, output_path: str) -> str:
         """
@@ -519,121 +669,245 @@ class PaperAnalyzer:
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write("# 论文分析报告\n\n")
-            f.write(f"**分析论文**: {self.analysis_results['paper_path']}\n\n")
-            f.write(f"**生成时间**: {self._get_current_time()}\n\n")
-            f.write("---\n\n")
-            
-            for category_result in self.analysis_results["categories"]:
-                category = category_result["category"]
-                f.write(f"## {category}\n\n")
-                
-                for qa_pair in category_result["qa_pairs"]:
-                    question = qa_pair["question"]
-                    answer = qa_pair["answer"]
-                    
-                    f.write(f"### {question}\n\n")
-                    f.write(f"{answer}\n\n")
-                    f.write("---\n\n")
+        # 先在内存中拼好整份报告，再一次性写入
+        parts = [self._render_header(self.analysis_results['paper_path'])]
+        for category_result in self.analysis_results["categories"]:
+            parts.append(self._render_category(category_result))
+        
+        output_path.write_text("".join(parts), encoding='utf-8')
         
         print(f"\n分析报告已保存: {output_path}")
         return str(output_path)
     
+    @classmethod
+    def _render_header(cls, paper_path: str) -> str:
+        """生成报告头部"""
+        return "".join([
+            "# 论文分析报告\n\n",
+            f"**分析论文**: {paper_path}\n\n",
+            f"**生成时间**: {cls._get_current_time()}\n\n",
+            "---\n\n",
+        ])
+    
+    @staticmethod
+    def _render_category(category_result: Dict) -> str:
+        """生成报告中一个类别的章节"""
+        parts = [f"## {category_result['category']}\n\n"]
+        parts.extend(
+            f"### {qa_pair['question']}\n\n{qa_pair['answer']}\n\n---\n\n"
+            for qa_pair in category_result["qa_pairs"]
+        )
+        return "".join(parts)
+    
     @staticmethod
     def _get_current_time() -> str:
         """获取当前时间字符串"""
-        from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+class _HeldStdout:
+    """sys.stdout的代理：登记了暂存缓冲区的线程写入各自的缓冲区，其余线程照常输出"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}  # 线程ident -> 暂存输出的StringIO
+    
+    def write(self, text):
+        return self.buffers.get(threading.get_ident(), self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class _Prefetch:
+    """
+    在后台守护线程中预先调用func（如转换下一篇PDF）
+    
+    守护线程不会阻止解释器退出，Ctrl+C时不必等待仍在进行的MinerU轮询；
+    后台调用期间print的内容暂存起来，轮到该论文调用result()时才输出，
+    不会穿插在当前论文的输出和确认提示中
+    """
+    
+    def __init__(self, stdout: _HeldStdout, func, *args):
+        self._stdout = stdout
+        self._output = io.StringIO()
+        self._value = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(func, args), daemon=True)
+        self._thread.start()
+    
+    def _run(self, func, args):
+        ident = threading.get_ident()
+        self._stdout.buffers[ident] = self._output
+        try:
+            self._value = func(*args)
+        except BaseException as e:
+            self._error = e
+        finally:
+            del self._stdout.buffers[ident]
+    
+    def result(self):
+        """等待调用完成，输出暂存的内容，返回func的结果（或抛出其异常）"""
+        self._thread.join()
+        sys.stdout.write(self._output.getvalue())
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
 class PaperReadingAgent:
     """论文阅读Agent - 主入口类"""
     
-    def __init__(self, llm_provider: str = "openai", use_mineru: bool = True, **llm_kwargs):
+    def __init__(self, llm_provider: str = "openai", use_mineru: bool = True,
+                 max_concurrency: int = 4, save_markdown: bool = True, stream: bool = False,
+                 max_paper_chars: Optional[int] = 200_000, use_cache: bool = True, **llm_kwargs):
         """
         初始化论文阅读Agent
         
         Args:
             llm_provider: LLM提供商 ("openai" 或 "gemini")
             use_mineru: 是否使用MinerU API转换PDF（更好的图片和公式支持）
+            max_concurrency: 分析论文时同时进行的LLM请求数上限
+            save_markdown: 是否把PDF转换得到的markdown保存到磁盘（分析本身直接使用内存中的文本）
+            stream: 是否以流式方式接收LLM回复
+            max_paper_chars: 发送给LLM的论文字数上限（None表示总是发送全文）
+            use_cache: 是否使用LLM回答的磁盘缓存（.paper_cache/）
             **llm_kwargs: LLM提供商的额外参数
         """
-        # 初始化LLM
-        if llm_provider.lower() == "openai":
-            self.llm = OpenAIProvider(**llm_kwargs)
-        elif llm_provider.lower() == "gemini":
-            self.llm = GeminiProvider(**llm_kwargs)
-        else:
+        # 初始化LLM（只导入选中的提供商）
+        provider_name = _PROVIDERS.get(llm_provider.lower())
+        if provider_name is None:
             raise ValueError(f"不支持的LLM提供商: {llm_provider}")
+        self.llm = _resolve(provider_name)(**llm_kwargs)
+        
+        self.save_markdown = save_markdown
         
         # 初始化PDF转换器和论文分析器
-        self.pdf_converter = PDFConverter(use_mineru=use_mineru)
-        self.analyzer = PaperAnalyzer(self.llm)
+        self.pdf_converter = _resolve("PDFConverter")(use_mineru=use_mineru)
+        cache_kwargs = {} if use_cache else {"cache_dir": None}
+        self.analyzer = PaperAnalyzer(self.llm, max_concurrency=max_concurrency, stream=stream,
+                                      max_paper_chars=max_paper_chars, **cache_kwargs)
     
-    def process_paper(self, pdf_path: str, output_dir: Optional[str] = None) -> str:
+    def process_paper(self, pdf_path: str, output_dir: Optional[str] = None,
+                      confirm: bool = True, paper_content: Optional[str] = None,
+                      force: bool = False) -> str:
         """
         处理论文的完整流程
         
         Args:
             pdf_path: PDF论文路径
             output_dir: 输出目录
+            confirm: 转换完成后是否暂停等待用户检查markdown（并发批量处理时关闭）
+            paper_content: 已由convert_paper转换好的markdown文本（批量处理时预先转换），None表示在此转换
+            force: 已存在（不早于PDF的）分析报告时是否仍重新分析
             
         Returns:
             分析报告的路径
         """
-        print("=" * 60)
-        print("论文阅读Agent - 开始处理")
-        print("=" * 60)
-        
-        # 步骤1: 转换PDF到Markdown
-        print("\n步骤1: 转换PDF到Markdown...")
-        markdown_path = self.pdf_converter.convert_to_markdown(pdf_path, output_dir)
+        report_path = self.report_path_for(pdf_path, output_dir)
+        if not force and self._report_is_current(pdf_path, report_path):
+            print(f"⚠️  已存在分析报告，跳过: {report_path}（如需重新分析，请使用--force或删除该报告）")
+            return str(report_path)
+        
+        # 多行输出合并为一次print，并发处理多篇论文时各篇的输出块不会互相穿插
+        print("\n".join(["=" * 60, "论文阅读Agent - 开始处理", "=" * 60]))
+        
+        # 步骤1: 转换PDF到Markdown（文本保存在内存中直接用于分析）
+        markdown_file = self.pdf_converter.markdown_path_for(pdf_path, output_dir)
+        markdown_path = str(markdown_file)
+        if paper_content is None:
+            paper_content = self.convert_paper(pdf_path, output_dir)
+        
+        # 提示用户检查markdown文件（仅当markdown已保存到磁盘）
+        if confirm and markdown_file.exists():
+            print("\n" + "=" * 60)
+            print(f"✅ Markdown转换完成：{markdown_path}")
+            print("\n您可以先检查转换结果：")
+            print(f"  - Markdown文件: {markdown_path}")
+            if markdown_file.parent.joinpath('images').exists():
+                print(f"  - 图片文件夹: {markdown_file.parent / 'images'}")
+            print("\n按回车键继续分析，或 Ctrl+C 中止...")
+            print("=" * 60)
+            try:
+                input()
+            except KeyboardInterrupt:
+                print("\n\n已取消分析")
+                return markdown_path
+            # 用户可能在暂停期间修改了markdown文件，按修改后的内容分析
+            paper_content = markdown_file.read_text(encoding='utf-8')
+        
+        report_path = str(report_path)
+        
+        # 步骤2: 分析论文并生成报告（与分析同时进行，每完成一个类别就写入报告）
+        print("\n步骤2: 分析论文并生成报告（随分析进度写入）...")
+        results = self.analyzer.analyze_text(paper_content, markdown_path, report_path=report_path)
+        if results["failed_categories"]:
+            # 未完成的报告不落到report_path，下次运行不会被当作已处理而跳过（成功的类别已缓存）
+            raise RuntimeError(f"{len(results['failed_categories'])}个类别分析失败"
+                               f"（{'、'.join(results['failed_categories'])}），请稍后重新运行")
+        print(f"\n分析报告已保存: {report_path}")
+        
+        print("\n".join([
+            "\n" + "=" * 60,
+            "处理完成！",
+            "=" * 60,
+            f"Markdown文件: {markdown_path}",
+            f"分析报告: {report_path}",
+        ]))
         
-        # 提示用户检查markdown文件
-        print("\n" + "=" * 60)
-        print(f"✅ Markdown转换完成：{markdown_path}")
-        print("\n您可以先检查转换结果：")
-        print(f"  - Markdown文件: {markdown_path}")
-        if Path(markdown_path).parent.joinpath('images').exists():
-            print(f"  - 图片文件夹: {Path(markdown_path).parent / 'images'}")
-        print("\n按回车键继续分析，或 Ctrl+C 中止...")
-        print("=" * 60)
-        try:
-            input()
-        except KeyboardInterrupt:
-            print("\n\n已取消分析")
-            return markdown_path
-        
-        # 步骤2: 分析论文
-        print("\n步骤2: 分析论文...")
-        self.analyzer.analyze_paper(markdown_path)
-        
-        # 步骤3: 生成报告
-        print("\n步骤3: 生成分析报告...")
-        pdf_name = Path(pdf_path).stem
+        return report_path
+    
+    @staticmethod
+    def report_path_for(pdf_path: str, output_dir: Optional[str] = None) -> Path:
+        """计算PDF对应的分析报告路径（默认放在PDF同目录）"""
+        pdf_path = Path(pdf_path)
+        report_name = f"{pdf_path.stem}_analysis.md"
         if output_dir:
-            report_path = Path(output_dir) / f"{pdf_name}_analysis.md"
-        else:
-            report_path = Path(pdf_path).parent / f"{pdf_name}_analysis.md"
-        
-        report_path = self.analyzer.save_analysis_report(str(report_path))
-        
-        print("\n" + "=" * 60)
-        print("处理完成！")
-        print("=" * 60)
-        print(f"Markdown文件: {markdown_path}")
-        print(f"分析报告: {report_path}")
+            return Path(output_dir) / report_name
+        return pdf_path.parent / report_name
+    
+    @staticmethod
+    def _report_is_current(pdf_path: str, report_path: Path) -> bool:
+        """报告是否存在且不早于PDF（同名PDF被替换后，旧报告视为过期需要重新分析）"""
+        try:
+            return report_path.stat().st_mtime >= Path(pdf_path).stat().st_mtime
+        except FileNotFoundError:
+            return False
+    
+    def convert_paper(self, pdf_path: str, output_dir: Optional[str] = None) -> str:
+        """
+        转换PDF到Markdown（已有转换结果时直接读取）
         
-        return report_path
+        Args:
+            pdf_path: PDF论文路径
+            output_dir: 输出目录
+            
+        Returns:
+            markdown文本
+        """
+        print("\n步骤1: 转换PDF到Markdown...")
+        try:
+            return self.pdf_converter.convert_to_markdown(pdf_path, output_dir, save=self.save_markdown)
+        except (FileNotFoundError, RuntimeError) as e:
+            # pymupdf对不存在的文件抛出RuntimeError子类；只在出错时才检查文件，统一成友好提示
+            if Path(pdf_path).exists():
+                raise
+            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}") from e
     
-    def batch_process_papers(self, papers_dir: str = "papers", output_dir: str = "output") -> List[str]:
+    def batch_process_papers(self, papers_dir: str = "papers", output_dir: str = "output",
+                             max_workers: int = 1, force: bool = False) -> List[str]:
         """
         批量处理papers文件夹中的所有PDF论文
         
         Args:
             papers_dir: 存放PDF论文的文件夹路径（默认: papers）
             output_dir: 输出目录（默认: output）
+            max_workers: 同时处理的论文数（默认: 1，逐篇处理并在每篇转换后暂停确认；
+                大于1时多篇论文并发处理，不再暂停）
+            force: 是否重新处理已有分析报告的论文（默认跳过，报告早于PDF时总是重新处理）
             
         Returns:
             所有生成的分析报告路径列表
@@ -641,61 +915,168 @@ class PaperReadingAgent:
         papers_path = Path(papers_dir)
         output_path = Path(output_dir)
         
-        # 确保目录存在
-        if not papers_path.exists():
-            papers_path.mkdir(parents=True, exist_ok=True)
+        # 确保目录存在（直接mkdir，已存在时由FileExistsError告知，省去exists()预检查）
+        try:
+            papers_path.mkdir(parents=True)
             print(f"已创建论文文件夹: {papers_path}")
+        except FileExistsError:
+            pass
         
-        if not output_path.exists():
-            output_path.mkdir(parents=True, exist_ok=True)
+        try:
+            output_path.mkdir(parents=True)
             print(f"已创建输出文件夹: {output_path}")
-        
-        # 查找所有PDF文件
-        pdf_files = list(papers_path.glob("*.pdf"))
+        except FileExistsError:
+            pass
+        
+        # 查找所有PDF文件（单次scandir，DirEntry.is_file()复用目录读取时的类型信息）
+        with os.scandir(papers_path) as entries:
+            pdf_files = [
+                Path(entry.path) for entry in entries
+                if entry.name.endswith(".pdf") and entry.is_file()
+            ]
         
         if not pdf_files:
             print(f"\n⚠️  在 {papers_path} 文件夹中没有找到PDF文件")
             print(f"请将PDF论文放入 {papers_path} 文件夹后再运行程序")
             return []
         
-        print(f"\n找到 {len(pdf_files)} 篇论文待处理")
-        print("=" * 60)
+        print(f"\n找到 {len(pdf_files)} 篇论文")
+        all_files = pdf_files
         
+        # 已有分析报告（且不早于PDF）的论文直接跳过，连PDF转换也不做
         results = []
-        successful = 0
-        failed = 0
+        if not force:
+            remaining = []
+            for pdf_file in pdf_files:
+                report_path = self.report_path_for(pdf_file, output_path)
+                if self._report_is_current(pdf_file, report_path):
+                    results.append(str(report_path))
+                else:
+                    remaining.append(pdf_file)
+            if results:
+                print(f"跳过 {len(results)} 篇已有分析报告的论文（如需重新分析，请使用--force）")
+            pdf_files = remaining
+        
+        # 内容完全相同的PDF只处理一次，之后直接复制其报告
+        pdf_files, duplicates = self._dedupe_pdfs(pdf_files)
+        for duplicate, original in duplicates:
+            print(f"跳过重复论文: {duplicate.name}（与 {original.name} 内容相同）")
+        print("=" * 60)
         
-        for i, pdf_file in enumerate(pdf_files, 1):
-            print(f"\n{'=' * 60}")
-            print(f"处理进度: [{i}/{len(pdf_files)}]")
-            print(f"当前论文: {pdf_file.name}")
-            print("=" * 60)
-            
-            try:
-                report_path = self.process_paper(str(pdf_file), str(output_path))
-                results.append(report_path)
-                successful += 1
-                print(f"\n✅ 成功: {pdf_file.name}")
-            except Exception as e:
-                failed += 1
-                print(f"\n❌ 失败: {pdf_file.name}")
-                print(f"错误信息: {str(e)[:200]}")
-                print(f"\n提示: 如果是网络问题，可以稍后重新运行程序")
-                print(f"提示: 已处理的论文会被跳过，只处理剩余的论文")
-                # 只在调试时显示完整堆栈
-                # import traceback
-                # traceback.print_exc()
+        # 每篇论文的瓶颈都是各自的网络I/O，互不依赖，可以并发处理；按原顺序收集结果
+        max_workers = max(1, min(max_workers, len(pdf_files)))
+        confirm = max_workers == 1
+        # 并发处理时，pymupdf4llm转换（CPU密集、持有GIL）放到进程池中，多篇论文才能同时转换
+        process_pool = None
+        if max_workers > 1 and not self.pdf_converter.use_mineru:
+            # 进程池的子进程在论文工作线程中首次submit时才创建，用spawn避免fork多线程进程导致死锁
+            process_pool = ProcessPoolExecutor(max_workers=min(max_workers, os.cpu_count() or 1),
+                                               mp_context=multiprocessing.get_context("spawn"))
+            self.pdf_converter.process_pool = process_pool
+        try:
+            if not pdf_files:
+                outcomes = []
+            elif max_workers == 1:
+                outcomes = self._process_pipelined(pdf_files, output_path)
+            else:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [
+                        executor.submit(self._process_one, i, len(pdf_files), pdf_file, output_path, confirm)
+                        for i, pdf_file in enumerate(pdf_files, 1)
+                    ]
+                    outcomes = [future.result() for future in futures]
+        finally:
+            if process_pool is not None:
+                self.pdf_converter.process_pool = None
+                process_pool.shutdown()
+        
+        results.extend(report_path for report_path in outcomes if report_path is not None)
+        
+        # 重复的论文复用已生成的报告（原论文处理失败或被取消时一并计为失败）
+        reports = dict(zip(pdf_files, outcomes))
+        for duplicate, original in duplicates:
+            report_path = reports[original]
+            if report_path != str(self.report_path_for(original, output_path)):
+                continue
+            duplicate_report = self.report_path_for(duplicate, output_path)
+            shutil.copyfile(report_path, duplicate_report)
+            results.append(str(duplicate_report))
+        
+        successful = len(results)
+        failed = len(all_files) - successful
         
         # 打印总结
         print("\n" + "=" * 60)
         print("批量处理完成！")
         print("=" * 60)
-        print(f"总计: {len(pdf_files)} 篇论文")
+        print(f"总计: {len(all_files)} 篇论文")
         print(f"成功: {successful} 篇")
         print(f"失败: {failed} 篇")
         print(f"\n所有结果已保存到: {output_path.absolute()}")
         
         return results
+    
+    @staticmethod
+    def _dedupe_pdfs(pdf_files: List[Path]) -> Tuple[List[Path], List[Tuple[Path, Path]]]:
+        """按文件内容的sha256去重，返回(需要处理的PDF, [(重复的PDF, 内容相同的原PDF)])"""
+        originals = {}  # 内容哈希 -> 第一个出现的PDF
+        unique, duplicates = [], []
+        for pdf_file in pdf_files:
+            digest = hashlib.sha256()
+            with open(pdf_file, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            original = originals.setdefault(digest.hexdigest(), pdf_file)
+            if original is pdf_file:
+                unique.append(pdf_file)
+            else:
+                duplicates.append((pdf_file, original))
+        return unique, duplicates
+    
+    def _process_pipelined(self, pdf_files: List[Path], output_path: Path) -> List[Optional[str]]:
+        """逐篇处理论文，同时在后台预先转换下一篇，使PDF转换与上一篇的LLM分析重叠"""
+        outcomes = []
+        stdout = sys.stdout = _HeldStdout(sys.stdout)
+        try:
+            next_conversion = _Prefetch(stdout, self.convert_paper, str(pdf_files[0]), str(output_path))
+            for i, pdf_file in enumerate(pdf_files, 1):
+                conversion = next_conversion
+                if i < len(pdf_files):
+                    next_conversion = _Prefetch(stdout, self.convert_paper, str(pdf_files[i]), str(output_path))
+                outcomes.append(self._process_one(i, len(pdf_files), pdf_file, output_path, True, conversion))
+        finally:
+            # 仍在后台转换的下一篇不再等待（守护线程随进程退出），它暂存的输出直接丢弃
+            sys.stdout = stdout.stream
+        return outcomes
+    
+    def _process_one(self, index: int, total: int, pdf_file: Path, output_path: Path,
+                     confirm: bool, conversion: Optional[_Prefetch] = None) -> Optional[str]:
+        """批量处理中的一篇论文，成功返回报告路径，失败打印错误并返回None"""
+        print("\n".join([
+            f"\n{'=' * 60}",
+            f"处理进度: [{index}/{total}]",
+            f"当前论文: {pdf_file.name}",
+            "=" * 60,
+        ]))
+        
+        try:
+            paper_content = conversion.result() if conversion is not None else None
+            # 是否跳过已有报告的论文已在batch_process_papers中统一判断过
+            report_path = self.process_paper(str(pdf_file), str(output_path), confirm=confirm,
+                                             paper_content=paper_content, force=True)
+            print(f"\n✅ 成功: {pdf_file.name}")
+            return report_path
+        except Exception as e:
+            print("\n".join([
+                f"\n❌ 失败: {pdf_file.name}",
+                f"错误信息: {str(e)[:200]}",
+                "\n提示: 如果是网络问题，可以稍后重新运行程序",
+                "提示: 已处理的论文会被跳过，只处理剩余的论文",
+            ]))
+            # 只在调试时显示完整堆栈
+            # import traceback
+            # traceback.print_exc()
+            return None
 
 
 def main():
@@ -730,12 +1111,22 @@ def main():
                         help="论文文件夹路径 (默认: papers)")
     parser.add_argument("--output-dir", default="output",
                         help="输出目录路径 (默认: output)")
+    parser.add_argument("--force", action="store_true",
+                        help="重新分析已有分析报告的论文（默认跳过）")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="批量模式下同时处理的论文数 (默认: 1；大于1时不再逐篇暂停确认)")
     
     # LLM配置
     parser.add_argument("--provider", choices=["openai", "gemini"], default="openai",
                         help="LLM提供商 (默认: openai)")
     parser.add_argument("--model", help="模型名称 (如: gpt-5, gemini-pro)")
     parser.add_argument("--api-key", help="API密钥 (也可通过环境变量设置)")
+    parser.add_argument("--stream", action="store_true",
+                        help="以流式方式接收LLM回复（长回答不易超时）")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="不使用LLM回答的磁盘缓存，所有问题重新请求")
+    parser.add_argument("--max-paper-chars", type=int, default=200_000,
+                        help="发送给LLM的论文字数上限，超出时先去掉参考文献再截断，0表示不限制 (默认: 200000)")
     
     # PDF转换配置
     parser.add_argument("--no-mineru", action="store_true",
@@ -743,6 +1134,14 @@ def main():
     
     args = parser.parse_args()
     
+    # 命令行下输出分析进度（日志只输出消息本身，与print输出到同一个stdout）；
+    # 只配置本模块的logger，根logger保持默认WARNING，httpx等第三方库的INFO日志不会混进输出
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    
     # 准备LLM参数
     llm_kwargs = {}
     if args.api_key:
@@ -764,22 +1163,29 @@ def main():
         else:
             print(f"PDF转换: pymupdf4llm（快速模式，图片公式支持有限）")
         
-        agent = PaperReadingAgent(llm_provider=args.provider, use_mineru=use_mineru, **llm_kwargs)
+        agent = PaperReadingAgent(llm_provider=args.provider, use_mineru=use_mineru,
+                                  stream=args.stream, max_paper_chars=args.max_paper_chars or None,
+                                  use_cache=not args.no_cache,
+                                  **llm_kwargs)
         
         # 判断是单文件模式还是批量处理模式
         if args.single:
             # 单文件模式
             print(f"\n📄 单文件模式")
-            agent.process_paper(args.single, args.output_dir)
+            agent.process_paper(args.single, args.output_dir, force=args.force)
         else:
             # 批量处理模式（默认）
             print(f"\n📚 批量处理模式")
             print(f"论文文件夹: {Path(args.papers_dir).absolute()}")
             print(f"输出文件夹: {Path(args.output_dir).absolute()}")
-            agent.batch_process_papers(args.papers_dir, args.output_dir)
+            agent.batch_process_papers(args.papers_dir, args.output_dir, max_workers=args.jobs,
+                                       force=args.force)
         
         return 0
         
+    except FileNotFoundError as e:
+        print(f"\n❌ 文件不存在: {e}")
+        return 1
     except Exception as e:
         print(f"\n❌ 错误: {e}")
         import traceback